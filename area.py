@@ -1,6 +1,16 @@
 from sieve import Sieve
+from functools import lru_cache
 import math
 
+@lru_cache(maxsize=None)
+def circle_offsets(radius):
+  # Circles only differ by their center, so the offsets inside each radius are worked out once
+  return tuple((a, b) for a in range(-radius, radius+1) for b in range(-radius, radius+1) if a**2+b**2 <= radius**2)
+
+@lru_cache(maxsize=None)
+def circle_offset_set(radius):
+  return frozenset(circle_offsets(radius))
+
 class Area(object):
   def __init__(self, bg, sieve_function=None, general=None, reach_function=None, selfcentered=False):
     self.bg = bg
@@ -66,10 +76,16 @@ class Circle(Area):
   def __init__(self, bg, sieve_function=None, general=None, reach_function=None, selfcentered=False, radius=5):
     super(Circle, self).__init__(bg, sieve_function, general, reach_function, selfcentered)
     self.radius = radius
+    # Auras ask around the same center turn after turn, so the last circle is kept
+    (self.last_x, self.last_y) = (None, None)
+    self.last_tiles = []
 
   def get_all_tiles(self, x, y):
-    square = [(a,b) for a in range(x-self.radius, x+self.radius+1) for b in range(y-self.radius, y+self.radius+1)]
-    return [self.bg.tiles[(a,b)] for (a,b) in square if self.bg.is_inside(a,b) and (a-x)**2+(b-y)**2 <= self.radius**2]
+    if x != self.last_x or y != self.last_y:
+      (tiles, is_inside) = (self.bg.tiles, self.bg.is_inside)
+      self.last_tiles = [tiles[(x+a, y+b)] for (a, b) in circle_offsets(self.radius) if is_inside(x+a, y+b)]
+      (self.last_x, self.last_y) = (x, y)
+    return self.last_tiles
       
 class CustomArea(Area):
   def __init__(self, bg, sieve_function=None, general=None, tiles=[]):
@@ -15,10 +15,20 @@ from config import DEBUG
 KEYMAP_SKILLS = "QWERTYUIOP"
 KEYMAP_SWAP = "123456789"
 KEYMAP_TACTICS = "ZXCVBNM"
+KEY_SPACE = ord(' ')
+KEY_STOP = ord('s')
+KEY_STOP_UPPER = ord('S')
 
 FLAG_PATTERN = re.compile(r"flag \((-?\d+),(-?\d+)\)")
 SKILL_PATTERN = re.compile(r"skill(\d) \((-?\d+),(-?\d+)\)")
 
+def keycodes(keymap):
+  codes = {}
+  for (n, c) in enumerate(keymap):
+    codes[ord(c)] = n
+    codes[ord(c.lower())] = n
+  return codes
+
 class BattleWindow(Window):
   def __init__(self, battleground, side, host = None, port = None, window_id = 1):
     if DEBUG:
@@ -33,11 +43,17 @@ class BattleWindow(Window):
     self.keymap_skills = KEYMAP_SKILLS[0:len(battleground.generals[side].skills)]
     self.keymap_swap = KEYMAP_SWAP[0:len(battleground.reserves[side])]
     self.keymap_tactics = KEYMAP_TACTICS[0:len(battleground.generals[side].tactics)]
+    # Input is polled many times per turn, so key codes map straight to what they trigger
+    self.swap_keys = dict((ord(c), n) for (n, c) in enumerate(self.keymap_swap))
+    self.skill_keys = keycodes(self.keymap_skills)
+    self.tactic_keys = keycodes(self.keymap_tactics)
     
     if DEBUG:
       sys.stdout.write("DEBUG: About to call super(BattleWindow, self).__init__\n")
     
     super(BattleWindow, self).__init__(battleground, side, host, port, window_id)
+    for i in [0,1]:
+      self.render_side_panel_static(i)
     
     if DEBUG:
       sys.stdout.write("DEBUG: BattleWindow.__init__ completed\n")
@@ -47,21 +63,22 @@ class BattleWindow(Window):
     return self.bg.generals[ai_side].ai_action(turn)
 
   def check_input(self, key, mouse, x, y):
-    if chr(key.c).upper() == 'S':
+    c = key.c
+    if c == KEY_STOP or c == KEY_STOP_UPPER:
       return "stop\n"
     if mouse.rbutton_pressed:
       return "flag ({0},{1})\n".format(x, y)
-    n = self.keymap_swap.find(chr(key.c)) # Number of the swap pressed
-    if n != -1: 
+    n = self.swap_keys.get(c) # Number of the swap pressed
+    if n is not None:
       return "swap{0}\n".format(n)
-    n = self.keymap_skills.find(chr(key.c).upper()) # Number of the skill pressed
-    if n != -1: 
-      if chr(key.c).isupper(): # With uppercase we show the area
+    n = self.skill_keys.get(c) # Number of the skill pressed
+    if n is not None:
+      if chr(c).isupper(): # With uppercase we show the area
         self.hover_function = self.bg.generals[self.side].skills[n].get_area_tiles
       else: # Use the skill
         self.hover_function = None
         return "skill{0} ({1},{2})\n".format(n, x, y)
-    if chr(key.c) == ' ':
+    if c == KEY_SPACE:
       if self.bg.generals[self.side].tactics.index(self.bg.generals[self.side].selected_tactic) == 0:
         n = self.bg.generals[self.side].tactics.index(self.bg.generals[self.side].previous_tactic)
       else:
@@ -70,7 +87,7 @@ class BattleWindow(Window):
     else:
       if self.bg.generals[self.side].tactics.index(self.bg.generals[self.side].selected_tactic) != 0:
         self.bg.generals[self.side].previous_tactic = self.bg.generals[self.side].selected_tactic
-      n = self.keymap_tactics.find(chr(key.c).upper()) # Number of the tactic pressed
+      n = self.tactic_keys.get(c, -1) # Number of the tactic pressed
     if n != -1:
       return "tactic{0}\n".format(n)
     return None
@@ -91,12 +108,12 @@ class BattleWindow(Window):
         self.bg.effects.remove(e)
     for m in copy.copy(self.bg.minions):
       if not m.alive:
-        self.bg.minions.remove(m)
+        self.bg.remove_minion(m)
 
   def process_messages(self, turn):
     for i in [0,1]:
-      if turn in self.messages[i]:
-        m = self.messages[i][turn]
+      m = self.messages[i].get(turn)
+      if m is not None:
         if DEBUG:
           sys.stdout.write(str(i) + "," + str(turn) + "#" + m)
         if m.startswith("stop"):
@@ -106,6 +123,7 @@ class BattleWindow(Window):
         elif m.startswith("swap"):
           if self.bg.generals[i].swap(int(m[4])):
             self.render_side_panel_clear(i)
+            self.render_side_panel_static(i)
         else:
           match = FLAG_PATTERN.match(m)
           if match:
@@ -117,12 +135,6 @@ class BattleWindow(Window):
                 self.message(self.bg.generals[i].name + ": " + self.bg.generals[i].skills[int(match.group(1))].quote,
                              self.bg.generals[i].color)
 
-  def render_msgs(self):
-    y = 0
-    for (line, color) in self.game_msgs:
-      self.con_msgs.print(0, y, line, color)
-      y += 1
-
   def render_info(self, x, y):
     self.con_info.print(0, 0, " " * INFO_WIDTH)
     i = -1
@@ -159,8 +171,6 @@ class BattleWindow(Window):
     line = 3
     for j in range(0, len(g.skills)):
       skill = g.skills[j]
-      white = concepts.STATUS_SELECTED
-      libtcod.console_put_char_ex(self.con_panels[i], bar_offset_x-1, line, KEYMAP_SKILLS[j], white, black)
       self.render_bar(self.con_panels[i], bar_offset_x, line, bar_length, skill.cd, skill.max_cd,
         concepts.STATUS_PROGRESS_DARK, concepts.STATUS_PROGRESS_LIGHT, black)
       line += 2
@@ -179,6 +189,13 @@ class BattleWindow(Window):
                         concepts.STATUS_PROGRESS_DARK, concepts.STATUS_PROGRESS_LIGHT, black)
       line += 2
 
+  def render_side_panel_static(self, i, bar_length=11, bar_offset_x=4):
+    # Skill hotkeys only change when the general is swapped
+    line = 3
+    for j in range(0, len(self.bg.generals[i].skills)):
+      self.con_panels[i].print(bar_offset_x-1, line, KEYMAP_SKILLS[j], concepts.STATUS_SELECTED, concepts.UI_BACKGROUND)
+      line += 2
+
   def render_tactics(self, i):
     bar_offset_x = 3
     line = 7 + len(self.bg.generals[i].skills)*2
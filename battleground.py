@@ -1,6 +1,8 @@
 import entity
 
+from config import DEBUG
 import concepts
+import itertools
 import libtcodpy as libtcod
 import sys
 
@@ -12,18 +14,31 @@ class Battleground(object):
     self.width = width
     self.effects = []
     self.minions = []
+    self.minion_set = set() # Mirrors minions for the membership tests of sieves and statuses
     self.generals = []
     self.reserves = [[], []]
     self.fortresses = []
+    self.requisition_production = [0, 0] # Per side, kept up to date by the fortresses
     self.tiles = {}
     if tilefile:
       self.load_tiles(tilefile)
     else:
       self.default_tiles()
     self.tiles[(-1, -1)] = Tile(-1, -1)
+    # Same tiles indexed [y][x], for hot loops that already know they are inside
+    self.tiles_arr = [[self.tiles[(x, y)] for x in range(width)] for y in range(height)]
+    self.fortress_set = set(self.fortresses) # For membership tests, the list keeps the order
+    # Terrain is static, so path searches can test passability without touching the tiles
+    self.passable_tiles = frozenset(pos for (pos, t) in self.tiles.items() if t.passable)
+    self.draw_terrain()
     self.hovered = []
+    self.hovered_color = None
     self.connect_fortresses()
 
+  def add_minion(self, minion):
+    self.minions.append(minion)
+    self.minion_set.add(minion)
+
   def connect_fortresses(self):
     for f in self.fortresses:
       f.get_connections()
@@ -40,23 +55,46 @@ class Battleground(object):
           self.tiles[(x,y)].color = (200, 200, 200)  # Light grey for better visibility
 
   def draw(self, con):
-    from config import DEBUG
-    tile_count = 0
-    for pos in self.tiles:
-      tile = self.tiles[pos]
-      if DEBUG:
-        if tile_count < 5:  # Only debug first few tiles to avoid spam
-          sys.stdout.write(f"DEBUG: Drawing tile at ({tile.x},{tile.y}) char='{tile.char}' color={tile.color}\n")
-      tile.draw(con)
-      tile_count += 1
+    # The terrain never changes, so only tiles that differ from it are drawn one by one
+    self.terrain.blit(con)
+    # Glyphs are gathered first and written into the console arrays in one go
+    xs, ys, chars, fgs, bgs = [], [], [], [], []
+    # tiles_arr only holds the tiles inside, so the (-1, -1) sentinel needs no bounds check
+    for tile in itertools.chain.from_iterable(self.tiles_arr):
+      if not (tile.effects or tile.entity or tile.bg_color is not tile.bg_original_color):
+        continue
+      (char, color, bg_color) = tile.get_glyph()
+      xs.append(tile.x)
+      ys.append(tile.y)
+      chars.append(ord(char))
+      fgs.append(color)
+      bgs.append(bg_color)
+    tile_count = len(xs)
+    if tile_count:
+      con.ch[ys, xs] = chars
+      con.fg[ys, xs] = fgs
+      con.bg[ys, xs] = bgs
     if DEBUG:
+      for i in range(min(tile_count, 5)): # Only debug first few tiles to avoid spam
+        sys.stdout.write(f"DEBUG: Drawing tile at ({xs[i]},{ys[i]}) char='{chr(chars[i])}' color={fgs[i]}\n")
       sys.stdout.write(f"DEBUG: Total tiles drawn: {tile_count}\n")
 
+  def draw_terrain(self):
+    self.terrain = libtcod.console_new(self.width, self.height)
+    # Only the tiles inside, without going through the sentinel and a bounds check for each one
+    for tile in itertools.chain.from_iterable(self.tiles_arr):
+      libtcod.console_put_char_ex(self.terrain, tile.x, tile.y, tile.char, tile.color, tile.bg_original_color)
+
   def hover_tiles(self, l, color=concepts.UI_HOVER_DEFAULT):
+    l = list(l) # Areas may hand us a one-shot filter
+    # Hovering is requested every turn, most of the time with the same tiles
+    if color is self.hovered_color and l == self.hovered and all(t.bg_color is color for t in l):
+      return
     self.unhover_tiles()
     for t in l:
       t.hover(color)
     self.hovered = l
+    self.hovered_color = color
 
   def is_inside(self, x, y):
     return 0 <= x < self.width and 0 <= y < self.height
@@ -76,6 +114,26 @@ class Battleground(object):
     for f in forts:
       self.fortresses.append(entity.Fortress(self, entity.NEUTRAL_SIDE, f[0], f[1], [self.tiles[f].char]*4, [concepts.ENTITY_DEFAULT]*4))
 
+  def reset(self):
+    # Battles reuse one battleground, so only what was placed on it has to go
+    for t in self.tiles.values():
+      t.entity = None
+      t.effects = []
+      t.bg_color = t.bg_original_color
+    for f in self.fortresses:
+      f.update_body()
+    self.effects = []
+    self.minions = []
+    self.minion_set = set()
+    self.generals = []
+    self.reserves = [[], []]
+    self.hovered = []
+    self.hovered_color = None
+
+  def remove_minion(self, minion):
+    self.minions.remove(minion)
+    self.minion_set.discard(minion)
+
   def unhover_tiles(self):
     for t in self.hovered:
       t.unhover()
@@ -99,13 +157,19 @@ class Tile(object):
     return self.passable and (self.entity == None or self.entity.is_ally(passenger))
 
   def draw(self, con):
+    (char, color, bg_color) = self.get_glyph()
+    libtcod.console_put_char_ex(con, self.x, self.y, char, color, bg_color)
+
+  def get_glyph(self):
     if len(self.effects) > 0 and self.effects[-1].char:
       drawable = self.effects[-1]
     elif self.entity:
       drawable = self.entity
     else:
       drawable = self
-    libtcod.console_put_char_ex(con, self.x, self.y, drawable.get_char(drawable.x-self.x,drawable.y-self.y), drawable.color, self.bg_color)
+    # get_char may update the color of big entities, so it goes first
+    char = drawable.get_char(drawable.x-self.x,drawable.y-self.y)
+    return (char, drawable.color, self.bg_color)
   
   def hover(self, color=concepts.UI_HOVER_DEFAULT):
     self.bg_color = color
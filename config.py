@@ -1,2 +1,4 @@
 # Global configuration
 DEBUG = False
+# Waiting for the vertical retrace on every flush stalls the turn loop, turns are paced by the game itself
+VSYNC = False
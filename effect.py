@@ -144,9 +144,9 @@ class Bouncing(Effect):
 class EffectLoop(Effect):
   def __init__(self, battleground, side=entity.NEUTRAL_SIDE, x=-1, y=-1, chars=[' '], color=concepts.ENTITY_DEFAULT, duration=1):
     super(EffectLoop, self).__init__(battleground, side, x, y, chars[0], color)
-    self.chars = chars
+    self.chars = tuple(chars)
     self.duration = duration
-    self.index = 0
+    self.frames = itertools.cycle(self.chars)
 
   def clone(self, x, y): 
     if self.bg.is_inside(x, y):
@@ -156,8 +156,7 @@ class EffectLoop(Effect):
   def update(self):
     if not self.alive: return
     self.duration -= 1
-    self.char = self.chars[self.index]
-    self.index = (self.index+1) % len(self.chars)
+    self.char = next(self.frames)
     if self.duration < 0:
       self.dissapear()
 
@@ -244,6 +243,9 @@ class Orb(Pathing):
             self.attacked_entities.append(entity)
 
 class Slash(Effect):
+  # Each step of the swing resolved once: the char to show and where to move from the general
+  SWING = tuple(zip(['|', '\\', '-', '/']*2, [(0,1),(1,1),(1,0),(1,-1),(0,-1),(-1,-1),(-1,0),(-1,1)]))
+
   def __init__(self, battleground, side=entity.NEUTRAL_SIDE, x=-1, y=-1, char='|', color=concepts.ENTITY_DEFAULT, power=10, steps=8, goto=1, area=None):
     super(Slash, self).__init__(battleground, side, x, y, char, color)
     self.general = self.bg.generals[side]
@@ -253,9 +255,7 @@ class Slash(Effect):
     self.center_x = x
     self.center_y = y
     self.direction = 0; 
-    self.chars = ['|', '\\', '-', '/']
     self.goto = goto
-    self.directions = [(0,1),(1,1),(1,0),(1,-1),(0,-1),(-1,-1),(-1,0),(-1,1)]
 
   def clone(self, x, y):
     if self.bg.is_inside(x, y):
@@ -268,9 +268,9 @@ class Slash(Effect):
     if abs(self.step) >= self.max_steps:
       self.dissapear()
       return
-    self.char = self.chars[(self.step+self.direction)%4]
+    (self.char, (dx, dy)) = self.SWING[(self.step+self.direction)%8]
     self.teleport(self.general.x, self.general.y)
-    self.move(*self.directions[(self.step+self.direction)%8])
+    self.move(dx, dy)
     self.step += int(copysign(1, self.goto))
     self.do_attack()
 
@@ -319,7 +319,7 @@ class Thunder(Effect):
       e = Explosion(self.bg, self.side, self.x, self.y, '*', concepts.EFFECT_ATTACK_LIGHT, self.power)
       if self.area:
         for t in self.area.get_tiles(self.x, self.y):
-          if (t.x, t.y) != (e.x, e.y):
+          if t.x != e.x or t.y != e.y:
             e.clone(t.x, t.y)
 
 class Wave(Effect):
@@ -20,6 +20,7 @@ class Entity(object):
     self.pushed = False
     self.alive = True
     self.statuses = []
+    self.status_by_name = {} # Same statuses as above, to find duplicates without a scan
     self.path = []
     self.attack_effect = None
     self.attack_type = "physical"
@@ -176,6 +177,8 @@ class Fortress(BigEntity):
     self.guests = []
     self.name = "Fortress"
     self.requisition_production = requisition_production
+    self.side = NEUTRAL_SIDE
+    self.change_side(side)
 
   def can_be_attacked(self):
     return True
@@ -186,6 +189,13 @@ class Fortress(BigEntity):
   def can_move(self, dx, dy):
     return False
 
+  def change_side(self, side):
+    if self.side != NEUTRAL_SIDE:
+      self.bg.requisition_production[self.side] -= self.requisition_production
+    self.side = side
+    if self.side != NEUTRAL_SIDE:
+      self.bg.requisition_production[self.side] += self.requisition_production
+
   def get_connections(self):
     # Gather all tiles inside and surrounding the fortress
     starting_tiles = [(self.x+i, self.y+j) for i in range(-1,3) for j in range(-1,3)] 
@@ -200,7 +210,7 @@ class Fortress(BigEntity):
         checked.append((x, y))
         for t in [(x+i, y+j) for i in range(-1,2) for j in range(-1,2)]:
           entity = self.bg.tiles[t].entity
-          if entity in self.bg.fortresses and entity is not self and entity not in self.connected_fortresses:
+          if entity in self.bg.fortress_set and entity is not self and entity not in self.connected_fortresses:
             self.connected_fortresses.append((entity, starting))
           if self.bg.tiles[t].passable and t not in checked:
             tiles.append(t)
@@ -208,7 +218,7 @@ class Fortress(BigEntity):
   def host(self, entity):
     if not self.can_host(entity) or len(self.guests) >= self.capacity: return
     if not self.guests:
-      self.side = entity.side
+      self.change_side(entity.side)
     self.bg.tiles[(entity.x, entity.y)].entity = None
     (entity.x, entity.y) = (self.x, self.y)
     self.bg.generals.remove(entity)
@@ -229,7 +239,7 @@ class Fortress(BigEntity):
     self.bg.generals.append(entity)
     self.refresh_chars()
     if not self.guests:
-      self.side = NEUTRAL_SIDE
+      self.change_side(NEUTRAL_SIDE)
 
 class Mine(Entity):
   def __init__(self, battleground, x=-1, y=-1, power=50):
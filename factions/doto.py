@@ -155,7 +155,7 @@ class Rubock(General):
                       SingleTarget(self.bg, is_enemy, self, is_inrange_close)))
     self.skills.append(DummySkill("Null Field", "Grants magic resistance to all allies"))
     self.skills.append(Skill(self, copy_spell, 140, [], "Spell Steal", "Copies the last spell used by the enemy",
-                      SingleTarget(self.bg, is_enemy_general, self, is_inrange_long)))
+                      SingleTarget(self.bg, is_enemy_general, self, is_inrange_long), short_circuit=True))
     self.skills.append(Skill(self, null, 1, [], "Spell Stolen", "Copy of the last spell used by the enemy"))
 
   def start_battle(self):
@@ -2,7 +2,7 @@ class Formation(object):
   def __init__(self, general):
     self.general = general
 
-  def place_minions(self): pass
+  def place_minions(self, n=None): pass
 
   def mirror(self, x, y):
     return (self.general.bg.width - x - 1, self.general.bg.height - y - 1) if self.general.side else (x, y)
@@ -12,8 +12,8 @@ class FlyingWedge(Formation):
     super(FlyingWedge, self).__init__(general)
     self.increment = increment
 
-  def place_minions(self):
-    n = self.general.minions_alive
+  def place_minions(self, n=None):
+    if n is None: n = self.general.minions_alive
     for i in range(14, 3, -1):
       offset_y = 0
       for x in range(i, 3, -1):
@@ -21,7 +21,7 @@ class FlyingWedge(Formation):
           if n <= 0: return
           minion_placed = self.general.minion.clone(*self.mirror(x, self.general.y + offset_y))
           if minion_placed is not None:
-            self.general.bg.minions.append(minion_placed)
+            self.general.bg.add_minion(minion_placed)
             n -= 1
           offset_y = abs(offset_y)+1 if j%2 else -offset_y
 
@@ -30,8 +30,8 @@ class InvertedWedge(Formation):
     super(InvertedWedge, self).__init__(general)
     self.increment = increment
 
-  def place_minions(self):
-    n = self.general.minions_alive
+  def place_minions(self, n=None):
+    if n is None: n = self.general.minions_alive
     for i in range(4, 15):
       offset_y = 0
       for x in range(i, 15):
@@ -39,7 +39,7 @@ class InvertedWedge(Formation):
           if n <= 0: return
           minion_placed = self.general.minion.clone(*self.mirror(x, self.general.y + offset_y))
           if minion_placed is not None:
-            self.general.bg.minions.append(minion_placed)
+            self.general.bg.add_minion(minion_placed)
             n -= 1
           offset_y = abs(offset_y)+1 if j%2 else -offset_y
 
@@ -48,8 +48,8 @@ class Rows(Formation):
     super(Rows, self).__init__(general)
     self.rows = rows
 
-  def place_minions(self):
-    n = self.general.minions_alive
+  def place_minions(self, n=None):
+    if n is None: n = self.general.minions_alive
     for x in range(5, 15):
       offset_y = 0
       r = self.rows
@@ -57,7 +57,7 @@ class Rows(Formation):
         if n <= 0: return
         minion_placed = self.general.minion.clone(*self.mirror(x, self.general.y + offset_y))
         if minion_placed is not None:
-          self.general.bg.minions.append(minion_placed)
+          self.general.bg.add_minion(minion_placed)
           n -= 1
         offset_y = abs(offset_y)+1 if r%2 or not self.rows%2 else -offset_y
         r -= 1
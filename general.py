@@ -60,7 +60,7 @@ class General(Minion):
 
   def place_flag(self, x, y):
     if self.flag:
-      if (self.flag.x, self.flag.y) == (x,y):
+      if self.flag.x == x and self.flag.y == y:
         return
       self.flag.dissapear()
     if self.bg.is_inside(x, y):
@@ -116,7 +116,7 @@ class General(Minion):
         dx = self.flag.x - self.x
         dy = self.flag.y - self.y
         if not self.move(math.copysign(1, dx) if dx else 0, math.copysign(1,dy) if dy else 0) \
-            or (self.x, self.y) == (self.flag.x, self.flag.y):
+            or (self.x == self.flag.x and self.y == self.flag.y):
           self.place_flag(-1, -1)
       else:
         if not self.try_attack():
@@ -160,7 +160,7 @@ class Conway(General):
     for i in [-1, 0, 1]:
       for j in [-1, 0, 1]:
         (x, y) = (tile.x+i, tile.y+j)
-        if (i, j) == (0, 0) or not self.bg.is_inside(x, y): continue
+        if (i == 0 and j == 0) or not self.bg.is_inside(x, y): continue
         if self.bg.tiles[(x, y)].entity is not None and self.bg.tiles[(x, y)].entity.is_ally(self): neighbours += 1
     # Any dead cell with exactly three live neighbours becomes a live cell, as if by reproduction.
     if tile.entity is None and neighbours == 3 and tile.passable: self.next_gen_births.append(tile)
@@ -185,7 +185,7 @@ class Conway(General):
         for tile in self.next_gen_births:
           minion_placed = self.minion.clone(tile.x, tile.y) 
           if minion_placed is not None:
-            self.bg.minions.append(minion_placed)
+            self.bg.add_minion(minion_placed)
         for tile in self.next_gen_deaths:
           tile.entity.die()
         self.recount_minions_alive()
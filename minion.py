@@ -8,6 +8,10 @@ import tactic
 
 from collections import defaultdict
 
+# Order: forward, backward, up, down, then diagonals
+REACH_ORDER = ((1, 0), (-1, 0), (0, -1), (0, 1))
+REACH_ORDER_DIAGONALS = REACH_ORDER + ((1, -1), (1, 1), (-1, -1), (-1, 1))
+
 class Minion(Entity):
   def __init__(self, battleground, side, x=-1, y=-1, name="minion", char='m', color=concepts.ENTITY_DEFAULT):
     super(Minion, self).__init__(battleground, side, x, y, char, color)
@@ -29,16 +33,14 @@ class Minion(Entity):
 
   def die(self):
     super(Minion, self).die()
-    if self in self.bg.minions:
+    if self in self.bg.minion_set:
       self.bg.generals[self.side].minions_alive -= 1
 
   def enemy_reachable(self, diagonals=False):
-    # Order: forward, backward, up, down, then diagonals
-    order = [(1, 0), (-1, 0), (0, -1), (0, 1)]
-    if diagonals:
-      order.extend([(1, -1), (1, 1), (-1, -1), (-1, 1)])
-    for (i, j) in order:
-      enemy = self.bg.tiles[(self.x + (-i if self.side else i), self.y + j)].entity
+    tiles = self.bg.tiles
+    forward = -1 if self.side else 1
+    for (i, j) in REACH_ORDER_DIAGONALS if diagonals else REACH_ORDER:
+      enemy = tiles[(self.x + forward*i, self.y + j)].entity
       if enemy and not self.is_ally(enemy) and enemy.can_be_attacked():
         return enemy
     return None
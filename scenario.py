@@ -8,10 +8,26 @@ from window import *
 import concepts
 import libtcodpy as libtcod
 
-import re
+from collections import deque
 
 KEYMAP_GENERALS = "QWERTYUIOP"
-MOVEGEN_PATTERN = re.compile(r"move_gen(\d) \((-?\d+),(-?\d+)\)")
+NEIGHBOUR_DELTAS = tuple((i, j) for i in range(-1,2) for j in range(-1,2) if (i, j) != (0, 0))
+
+# Messages are kept as (opcode, general, ...) tuples and only turned into text for the network
+OP_MOVE_GEN = 1
+OP_APPLY_REQ = 2
+
+def parse_move_gen(msg):
+  # "move_genN (x,y)", sliced by hand since this runs for every message
+  if not msg.startswith("move_gen"): return None
+  paren = msg.find(" (", 8)
+  comma = msg.find(",", paren)
+  end = msg.find(")", comma)
+  if paren == -1 or comma == -1 or end == -1: return None
+  try:
+    return (int(msg[8:paren]), int(msg[paren+2:comma]), int(msg[comma+1:end]))
+  except ValueError:
+    return None
 
 class Scenario(Window):
   def __init__(self, battleground, side, factions, host = None, port = None, window_id = 0):
@@ -20,7 +36,15 @@ class Scenario(Window):
     self.requisition = [999, 300]
     self.max_requisition = 999
     self.keymap_generals = KEYMAP_GENERALS[0:len(factions[side].generals)]
+    # Input is polled many times per turn, so key codes map straight to the general pressed
+    self.general_keys = {}
+    for (n, c) in enumerate(self.keymap_generals):
+      self.general_keys[ord(c)] = n
+      self.general_keys[ord(c.lower())] = n
     self.selected_general = None
+    self.battle_bg = Battleground(BG_WIDTH, BG_HEIGHT)
+    for i in [0,1]:
+      self.render_side_panel_static(i)
     for f in factions:
       for g in f.generals:
         g.start_scenario()
@@ -50,20 +74,28 @@ class Scenario(Window):
       self.requisition[general.side] = 0
 
   def check_input(self, key, mouse, x, y):
-    n = self.keymap_generals.find(chr(key.c).upper()) # Number of the general pressed
-    # return None  # Simplified for now
-    if n != -1:
+    n = self.general_keys.get(key.c) # Number of the general pressed
+    if n is not None:
       g = self.factions[self.side].generals[n]
       if g.deployed:
         self.selected_general = g
         if not self.bg.is_inside(x, y):
           return
-        return "move_gen{0} ({1},{2})\n".format(n, x, y) 
+        return (OP_MOVE_GEN, n, x, y)
       else:
         self.selected_general = None
-        return "apply_req{0}\n".format(n)
+        return (OP_APPLY_REQ, n)
     return None
 
+  def decode_message(self, data):
+    if data.startswith("apply_req"):
+      try:
+        return (OP_APPLY_REQ, int(data[9:]))
+      except ValueError:
+        return None
+    move = parse_move_gen(data)
+    return (OP_MOVE_GEN,) + move if move else None
+
   def deploy_general(self, general):
     if general.teleport(1 if general.side == 0 else 56+self.i, 21):
       general.target = (4,21) if general.side == 0 else (52,21)
@@ -76,70 +108,81 @@ class Scenario(Window):
       return True
     return False
 
+  def encode_message(self, msg):
+    if msg[0] == OP_APPLY_REQ:
+      return "apply_req{0}\n".format(msg[1])
+    return "move_gen{0} ({1},{2})\n".format(*msg[1:])
+
   def get_next_tile(self, general):
-    for t in [(general.x+i, general.y+j) for i in range(-1,2) for j in range(-1,2)]:
-      if self.bg.tiles[t].entity == self.bg.tiles[general.target].entity:
-        return t
+    target = self.bg.tiles[general.target].entity
+    tiles_arr = self.bg.tiles_arr
+    passable = self.bg.passable_tiles
+    for (i, j) in ((0, 0),) + NEIGHBOUR_DELTAS:
+      if tiles_arr[general.y+j][general.x+i].entity == target:
+        return (general.x+i, general.y+j)
     starting_tiles = general.get_passable_neighbours()
-    checked = [(general.x, general.y)]
+    checked = {(general.x, general.y)}
     for starting in starting_tiles:
-      tiles = [starting]
+      tiles = deque([starting])
+      checked.add(starting)
       while tiles:
-        (x, y) = tiles.pop()
-        checked.append((x, y))
-        for t in [(x+i, y+j) for i in range(-1,2) for j in range(-1,2)]:
-          if self.bg.tiles[t].entity == self.bg.tiles[general.target].entity:
+        (x, y) = tiles.popleft()
+        for (i, j) in NEIGHBOUR_DELTAS:
+          if tiles_arr[y+j][x+i].entity == target:
             return starting
-          if self.bg.tiles[t].passable and t not in checked:
+          t = (x+i, y+j)
+          if t in passable and t not in checked:
+            checked.add(t)
             tiles.append(t)
 
   def increment_requisition(self):
-    for f in self.bg.fortresses:
-      if f.side != NEUTRAL_SIDE:
-        self.requisition[f.side] += f.requisition_production
-    for i in [0,1]:
-      if self.requisition[i] > self.max_requisition:
-        self.requisition[i] = self.max_requisition
+    (requisition, production) = (self.requisition, self.bg.requisition_production)
+    requisition[0] = min(requisition[0] + production[0], self.max_requisition)
+    requisition[1] = min(requisition[1] + production[1], self.max_requisition)
 
   def process_messages(self, turn):
     for i in [0,1]:
-      if turn in self.messages[i]:
-        if self.messages[i][turn].startswith("apply_req"):
-          self.apply_requisition(self.factions[i].generals[int(self.messages[i][turn][9])])
-        else:
-          match = MOVEGEN_PATTERN.match(self.messages[i][turn])
-          if match:
-            g = self.factions[i].generals[int(match.group(1))]
-            (x, y) = (int(match.group(2)), int(match.group(3)))
-            if not self.bg.is_inside(x, y):
-              return
-            target = self.bg.tiles[(x, y)].entity
-            home = self.bg.tiles[(g.x, g.y)].entity
-            if (target in self.bg.fortresses and home in self.bg.fortresses and g in home.guests):
-              for (f, tile) in home.connected_fortresses:
-                if f == target:
-                  # Send general g out from fortress home to fortress target thorugh tile
-                  (g.x, g.y) = tile
-                  g.home = (home.x, home.y)
-                  g.target = (target.x, target.y)
-                  home.unhost(g)
-                  return
+      msg = self.messages[i].get(turn)
+      if msg is not None:
+        generals = self.factions[i].generals
+        if msg[0] == OP_APPLY_REQ:
+          self.apply_requisition(generals[msg[1]])
+        elif msg[0] == OP_MOVE_GEN:
+          (_, n, x, y) = msg
+          g = generals[n]
+          if not self.bg.is_inside(x, y):
+            return
+          target = self.bg.tiles_arr[y][x].entity
+          home = self.bg.tiles[(g.x, g.y)].entity
+          if (target in self.bg.fortress_set and home in self.bg.fortress_set and g in home.guests):
+            for (f, tile) in home.connected_fortresses:
+              if f == target:
+                # Send general g out from fortress home to fortress target thorugh tile
+                (g.x, g.y) = tile
+                g.home = (home.x, home.y)
+                g.target = (target.x, target.y)
+                home.unhost(g)
+                return
 
   def render_side_panel(self, i, bar_length, bar_offset_x):
-    self.con_panels[i].print(bar_offset_x-1, 0, " Requisition", concepts.UI_TEXT)
-    self.render_bar(self.con_panels[i], bar_offset_x, 1, bar_length, self.requisition[i], self.max_requisition, concepts.STATUS_PROGRESS_DARK, concepts.STATUS_PROGRESS_LIGHT, concepts.UI_BACKGROUND)
+    con = self.con_panels[i]
+    render_bar = self.render_bar
+    render_bar(con, bar_offset_x, 1, bar_length, self.requisition[i], self.max_requisition, concepts.STATUS_PROGRESS_DARK, concepts.STATUS_PROGRESS_LIGHT, concepts.UI_BACKGROUND)
     line = 4
-    for j in range(0, len(self.factions[i].generals)):
-      g = self.factions[i].generals[j]
+    for (j, g) in enumerate(self.factions[i].generals):
       fg_color = g.color if g == self.selected_general else concepts.STATUS_SELECTED
-      self.con_panels[i].print(bar_offset_x-1, line, " " + g.name, fg_color)
-      libtcod.console_put_char_ex(self.con_panels[i], bar_offset_x-1, line+1, KEYMAP_GENERALS[j], g.color, concepts.UI_BACKGROUND)
+      con.print(bar_offset_x-1, line, " " + g.name, fg_color)
+      con.print(bar_offset_x-1, line+1, KEYMAP_GENERALS[j], g.color, concepts.UI_BACKGROUND)
       if not g.deployed:
-        self.render_bar(self.con_panels[i], bar_offset_x, line+1, bar_length, g.requisition, g.cost, concepts.STATUS_PROGRESS_DARK, concepts.STATUS_PROGRESS_LIGHT, concepts.UI_BACKGROUND)
+        render_bar(con, bar_offset_x, line+1, bar_length, g.requisition, g.cost, concepts.STATUS_PROGRESS_DARK, concepts.STATUS_PROGRESS_LIGHT, concepts.UI_BACKGROUND)
       else: 
-        self.render_bar(self.con_panels[i], bar_offset_x, line+1, bar_length, g.hp, g.max_hp, concepts.STATUS_HEALTH_LOW, concepts.STATUS_HEALTH_MEDIUM, concepts.UI_BACKGROUND)
+        render_bar(con, bar_offset_x, line+1, bar_length, g.hp, g.max_hp, concepts.STATUS_HEALTH_LOW, concepts.STATUS_HEALTH_MEDIUM, concepts.UI_BACKGROUND)
       line += 3
 
+  def render_side_panel_static(self, i, bar_length=11, bar_offset_x=4):
+    # Panels are never cleared, so the title is printed once instead of every frame
+    self.con_panels[i].print(bar_offset_x-1, 0, " Requisition", concepts.UI_TEXT)
+
   def start_battle(self, generals):
     if generals[0].side != 0: # Left side must be the first
       (generals[0], generals[1]) = (generals[1], generals[0])
@@ -147,7 +190,8 @@ class Scenario(Window):
     #thread.start_new_thread(self.start_battle_thread, (generals,))
 
   def start_battle_thread(self, generals):
-    battleground = Battleground(BG_WIDTH, BG_HEIGHT)
+    self.battle_bg.reset()
+    battleground = self.battle_bg
     battleground.generals = generals
     scenario_pos = []
     for g in generals:
@@ -169,7 +213,7 @@ class Scenario(Window):
         continue
       enemy = g.enemy_reachable(diagonals=True)
       if enemy is not None and enemy.side != NEUTRAL_SIDE:
-        if enemy in self.bg.fortresses:
+        if enemy in self.bg.fortress_set:
           if enemy.guests:
             e = enemy.guests[-1]
             self.start_battle([g, e])
@@ -181,7 +225,7 @@ class Scenario(Window):
         t = self.get_next_tile(g)
         if t:
           entity = self.bg.tiles[t].entity
-          if entity in self.bg.fortresses:
+          if entity in self.bg.fortress_set:
             entity.host(g)
           elif g.can_move(t[0]-g.x, t[1]-g.y):
             g.move(t[0]-g.x, t[1]-g.y)
@@ -1,240 +1,269 @@
+import asyncio
+import logging
+import signal
 import socket
 import sys
-import threading
 import time
-from datetime import datetime
 import os
 
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
 # DEBUG = True  # Set to False to disable debug logging
 from config import DEBUG
 
-MSG_EXIT = "EXIT"
-
+MSG_EXIT = b"EXIT"
+RECV_SIZE = 65536
+SOCKET_BUFFER_SIZE = 4*1024*1024
+# Linux only, the kernel drops back to delayed ACKs on its own so it is set again after every recv
+TCP_QUICKACK = getattr(socket, "TCP_QUICKACK", None)
+# Most chunks a single sendmsg call accepts
+IOV_MAX = os.sysconf("SC_IOV_MAX") if "SC_IOV_MAX" in getattr(os, "sysconf_names", {}) else 1024
 
-def debug_log(message, level="INFO"):
-    """Enhanced logging function with timestamps and debug levels"""
-    if DEBUG or level != "DEBUG":
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-        print(f"[{timestamp}] [{level}] {message}")
+# Messages are only formatted when their level is enabled
+log = logging.getLogger("rogueforce.server")
+log.setLevel(logging.DEBUG if DEBUG else logging.INFO)
 
 class Server(object):
     def __init__(self, port1, port2):
-        debug_log(f"Initializing server on ports {port1} and {port2}")
+        log.info("Initializing server on ports %s and %s", port1, port2)
         self.s = []
-        self.c = []
+        self.c = [None, None]
+        self.pending = [[], []] # Chunks waiting to be sent to each client, as they were received
+        # Every client is read into the same buffer each time
+        self.rx_buf = [bytearray(RECV_SIZE), bytearray(RECV_SIZE)]
+        self.rx_view = [memoryview(b) for b in self.rx_buf]
+        self.readers = [None, None]
+        self.flushers = [None, None]
         self.a = []
         self.running = False
-        self.shutdown_requested = False
-        self._shutdown_lock = threading.Lock()
+        self.stopped = None
         self._closing = False
         self.start_time = time.time()
-        
+
         for i in [0,1]:
             try:
-                debug_log(f"Setting up socket {i} on port {port1 if i == 0 else port2}")
+                log.info("Setting up socket %s on port %s", i, port1 if i == 0 else port2)
                 self.s.append(socket.socket(socket.AF_INET, socket.SOCK_STREAM))
+                # Restarting the server must not wait for the old sockets to leave TIME_WAIT
+                self.s[i].setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                if hasattr(socket, "SO_REUSEPORT"):
+                    self.s[i].setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+                # Buffers are set before listen() so accepted clients inherit them with a matching window scale
+                self.s[i].setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE)
+                self.s[i].setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_SIZE)
                 self.s[i].bind(('', port1 if i == 0 else port2))
                 self.s[i].listen(1)
-                # Set socket timeout to allow graceful shutdown
-                self.s[i].settimeout(1.0)
-                debug_log(f"Socket {i} successfully bound to port {port1 if i == 0 else port2}")
+                self.s[i].setblocking(False)
+                log.info("Socket %s successfully bound to port %s", i, port1 if i == 0 else port2)
             except Exception as e:
-                debug_log(f"Error setting up socket {i}: {e}", "ERROR")
+                log.error("Error setting up socket %s: %s", i, e)
                 sys.exit(1)
-        
-        # Start threads first, then accept connections
-        debug_log("Starting server threads and accepting connections")
-        self.launch()
 
     def close(self):
-        # Prevent multiple calls to close()
-        with self._shutdown_lock:
-            if self._closing:
-                debug_log("Server already closing, ignoring duplicate close request", "DEBUG")
-                return
-            self._closing = True
-        
-        debug_log("Server shutdown initiated")
-        self.shutdown_requested = True
+        # Both an EXIT message and a signal can ask for it
+        if self._closing:
+            log.debug("Server already closing, ignoring duplicate close request")
+            return
+        self._closing = True
+        log.info("Server shutdown initiated")
         self.running = False
+        self.stopped.set()
+
+    def shutdown(self):
         uptime = time.time() - self.start_time
-        debug_log(f"Server uptime: {uptime:.2f} seconds")
-        
+        log.info("Server uptime: %.2f seconds", uptime)
+
         # Close client sockets first
-        debug_log(f"Closing {len(self.c)} client connections")
+        clients = [client for client in self.c if client is not None]
+        log.info("Closing %s client connections", len(clients))
         for i, client in enumerate(self.c):
+            if client is None:
+                continue
             try:
-                debug_log(f"Closing client {i} connection")
+                log.info("Closing client %s connection", i)
                 client.close()
-                debug_log(f"Client {i} connection closed successfully")
+                log.info("Client %s connection closed successfully", i)
             except Exception as e:
-                debug_log(f"Error closing client {i}: {e}", "ERROR")
-        
+                log.error("Error closing client %s: %s", i, e)
+
         # Close server sockets
-        debug_log("Closing server sockets")
+        log.info("Closing server sockets")
         for i, server_socket in enumerate(self.s):
             try:
-                debug_log(f"Closing server socket {i}")
+                log.info("Closing server socket %s", i)
                 server_socket.close()
-                debug_log(f"Server socket {i} closed successfully")
+                log.info("Server socket %s closed successfully", i)
             except Exception as e:
-                debug_log(f"Error closing server socket {i}: {e}", "ERROR")
-        
-        debug_log("Server shutdown completed")
+                log.error("Error closing server socket %s: %s", i, e)
 
-    def launch(self):
-        debug_log("Launching server - starting accept connections thread")
+        log.info("Server shutdown completed")
+
+    async def serve(self):
+        loop = asyncio.get_running_loop()
+        log.info("Relay loop started")
+        cpu = os.environ.get("ROGUEFORCE_CPU")
+        if cpu is not None and hasattr(os, "sched_setaffinity"):
+            try:
+                os.sched_setaffinity(0, {int(cpu)})
+                log.info("Relay loop pinned to CPU %s", cpu)
+            except (ValueError, OSError) as e:
+                log.error("Could not pin relay loop to CPU %s: %s", cpu, e)
+        self.stopped = asyncio.Event()
+        try:
+            loop.add_signal_handler(signal.SIGINT, self.close)
+        except (NotImplementedError, RuntimeError):
+            pass
         self.running = True
-        # Accept connections in separate threads to avoid blocking
-        threading.Thread(target=self.accept_connections, name="AcceptThread").start()
-        debug_log("Accept connections thread started")
+        self.readers = [loop.create_task(self.handle_client(i)) for i in [0,1]]
+        await self.stopped.wait()
+        # Sockets are only closed once nothing is waiting on them anymore
+        tasks = [task for task in self.readers + self.flushers if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        log.info("Relay loop ending")
+        self.shutdown()
 
-    def accept_connections(self):
-        thread_name = threading.current_thread().name
-        debug_log(f"Accept connections thread {thread_name} started")
+    async def handle_client(self, i):
+        loop = asyncio.get_running_loop()
         try:
-            # Keep trying to accept connections until both clients are connected
-            while len(self.c) < 2 and not self.shutdown_requested:
-                for i in [0,1]:
-                    # Check for shutdown before trying to accept
-                    if self.shutdown_requested:
-                        debug_log(f"Accept thread checking shutdown flag before client {i} connection", "DEBUG")
-                        break
-                    
-                    # Only try to accept on socket if we don't have a client for it yet
-                    if len(self.c) <= i:
-                        debug_log(f"Waiting for client {i} to connect on socket {i}")
-                        try:
-                            client, address = self.s[i].accept()
-                            self.c.append(client)
-                            self.a.append(address)
-                            debug_log(f"Client {i} connected from {address}")
-                            
-                            # Start listening thread for each client
-                            thread_name = f"ListenThread-{i}"
-                            debug_log(f"Starting listening thread {thread_name} for client {i}")
-                            threading.Thread(target=self.listen, args=(i,), name=thread_name).start()
-                            debug_log(f"Listening thread {thread_name} started for client {i}")
-                            
-                            if len(self.c) == 2:
-                                debug_log("Both clients connected, stop accepting new connections")
-                                break
-                        except socket.timeout:
-                            debug_log(f"Socket {i} timeout while waiting for client", "DEBUG")
-                            continue
-                        except Exception as e:
-                            # Only treat as error if not shutting down
-                            if not self.shutdown_requested:
-                                debug_log(f"Error accepting connection on socket {i}: {e}", "ERROR")
-                            break
-                    
-                    # Small delay to prevent tight loop
-                    time.sleep(0.1)
-                    
+            client, address = await loop.sock_accept(self.s[i])
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            if not self.shutdown_requested:
-                debug_log(f"Error in accept connections thread: {e}", "ERROR")
-        finally:
-            debug_log(f"Accept connections thread {thread_name} ending")
+            log.error("Error accepting connection on socket %s: %s", i, e)
+            return
+        client.setblocking(False)
+        # Turn messages are tiny, Nagle would hold each one back waiting for an ACK
+        client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.c[i] = client
+        self.a.append(address)
+        log.info("Client %s connected from %s", i, address)
+        if all(self.c):
+            log.info("Both clients connected, stop accepting new connections")
 
-    def listen(self, i):
-        thread_name = threading.current_thread().name
-        debug_log(f"Listen thread {thread_name} started for client {i}")
-        try:
-            while not self.shutdown_requested and self.running:
-                debug_log(f"Client {i} - waiting to receive data (thread: {thread_name})", "DEBUG")
+        view = self.rx_view[i]
+        while True:
+            try:
+                n = await loop.sock_recv_into(client, view)
+                if TCP_QUICKACK is not None:
+                    client.setsockopt(socket.IPPROTO_TCP, TCP_QUICKACK, 1)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error("Socket error receiving from client %s: %s", i, e)
+                self.disconnect(i)
+                return
+
+            if n == 0:
+                log.info("Client %s disconnected (empty data received)", i)
+                self.disconnect(i)
+                return
+
+            data = view[:n]
+            # Game messages carry a binary header and are never decoded, only a bare EXIT is looked for
+            if n <= len(MSG_EXIT) + 2 and bytes(data).rstrip() == MSG_EXIT:
+                log.info("Client %s requested exit with message: %r", i, MSG_EXIT)
+                log.info("Initiating server shutdown due to client exit request")
+                self.close()
+                return
+
+            other_client = (i+1)%2
+            if self.c[other_client] is None:
+                log.error("Client %s is not connected, dropping %s bytes", other_client, n)
+                continue
+            if self.flushers[other_client] is None:
+                # Nothing is queued ahead of it, so it leaves straight from the receive buffer
                 try:
-                    data = self.c[i].recv(1024)
-                except socket.timeout:
-                    continue
+                    sent = self.c[other_client].send(data)
+                except BlockingIOError:
+                    sent = 0
                 except Exception as e:
-                    if not self.shutdown_requested:
-                        debug_log(f"Socket error receiving from client {i}: {e}", "ERROR")
-                    break
-                
-                if not data:
-                    debug_log(f"Client {i} disconnected (empty data received)")
-                    break
-                
-                # Decode bytes to string for proper comparison
-                data_str = data.decode('utf-8').rstrip()
-                debug_log(f"Client {i} sent: '{data_str}' (length: {len(data)} bytes)")
-                
-                if data_str == MSG_EXIT:
-                    debug_log(f"Client {i} requested exit with message: '{MSG_EXIT}'")
-                    debug_log("Initiating server shutdown due to client exit request")
-                    self.close()
-                    return
-                else:
-                    other_client = (i+1)%2
-                    debug_log(f"Forwarding message from client {i} to client {other_client}")
+                    log.error("Error sending to client %s: %s", other_client, e)
+                    self.disconnect(other_client)
+                    continue
+                if sent == n:
+                    continue
+                data = data[sent:]
+            # The receive buffer is reused, so whatever has to wait is copied out of it.
+            # Whatever arrives while a send is in flight goes out with the next one
+            self.pending[other_client].append(bytes(data))
+            if self.flushers[other_client] is None:
+                self.flushers[other_client] = loop.create_task(self.flush(other_client))
+
+    async def flush(self, i):
+        loop = asyncio.get_running_loop()
+        client = self.c[i]
+        try:
+            while self.pending[i]:
+                chunks = self.pending[i][:IOV_MAX]
+                del self.pending[i][:len(chunks)]
+                # The kernel gathers the chunks itself, so they are not copied into one buffer first
+                if hasattr(client, "sendmsg"):
                     try:
-                        self.c[other_client].send(data)
-                        debug_log(f"Successfully forwarded {len(data)} bytes to client {other_client}")
-                    except Exception as e:
-                        debug_log(f"Error sending to client {other_client}: {e}", "ERROR")
-                        debug_log(f"Message forwarding failed for client {other_client}")
-                        
-                        # Check if the other client is still connected
-                        try:
-                            # Try to send a test message to check connection
-                            self.c[other_client].send(b"PING")
-                            debug_log(f"Client {other_client} is still responsive")
-                        except:
-                            debug_log(f"Client {other_client} appears to be disconnected", "ERROR")
-                            break
-                            
+                        sent = client.sendmsg(chunks)
+                    except BlockingIOError:
+                        sent = 0
+                else:
+                    sent = 0
+                # Only what did not fit in the socket buffer waits for it to drain
+                if sent < sum(map(len, chunks)):
+                    await loop.sock_sendall(client, memoryview(b"".join(chunks))[sent:])
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            if not self.shutdown_requested:
-                debug_log(f"Error in listen thread {i} ({thread_name}): {e}", "ERROR")
+            log.error("Error sending to client %s: %s", i, e)
+            self.disconnect(i)
         finally:
-            debug_log(f"Listen thread {thread_name} for client {i} ending")
-            if i < len(self.c):
-                try:
-                    debug_log(f"Cleaning up client {i} connection")
-                    self.c[i].close()
-                    debug_log(f"Client {i} connection cleaned up successfully")
-                except Exception as e:
-                    debug_log(f"Error cleaning up client {i}: {e}", "ERROR")
+            if self.flushers[i] is asyncio.current_task():
+                self.flushers[i] = None
+
+    def disconnect(self, i):
+        log.info("Cleaning up client %s connection", i)
+        current = asyncio.current_task()
+        for task in (self.readers[i], self.flushers[i]):
+            if task is not None and task is not current:
+                task.cancel()
+        self.flushers[i] = None
+        try:
+            self.c[i].close()
+            log.info("Client %s connection cleaned up successfully", i)
+        except Exception as e:
+            log.error("Error cleaning up client %s: %s", i, e)
+        self.c[i] = None
+        del self.pending[i][:]
 
 if __name__ == "__main__":
-    debug_log("=== SERVER STARTUP ===")
-    debug_log(f"Python version: {sys.version}")
-    debug_log(f"Command line args: {sys.argv}")
-    
+    # The record already carries its milliseconds, only the seconds go through strftime
+    logging.basicConfig(stream=sys.stdout, format="[%(asctime)s.%(msecs)03d] [%(levelname)s] %(message)s",
+                        datefmt="%Y-%m-%d %H:%M:%S")
+    log.info("=== SERVER STARTUP ===")
+    log.info("Python version: %s", sys.version)
+    log.info("Command line args: %s", sys.argv)
+
     if len(sys.argv) != 2:
-        debug_log("Usage: python server.py <port>", "ERROR")
+        log.error("Usage: python server.py <port>")
         print("Usage: python server.py <port>")
         sys.exit(1)
-    
+
     p = int(sys.argv[1])
-    debug_log(f"Starting server with base port: {p}")
-    debug_log(f"Expected socket ports: {p} and {p+1}")
-    
+    log.info("Starting server with base port: %s", p)
+    log.info("Expected socket ports: %s and %s", p, p+1)
+
     try:
-        debug_log("Creating Server instance")
+        log.info("Creating Server instance")
         server = Server(p, p+1)
-        debug_log("Server instance created successfully, entering main loop")
-        
-        # Keep main thread alive
-        connection_count = 0
-        while server.running:
-            connection_count += 1
-            if connection_count % 10 == 0:  # Log every 10 iterations
-                debug_log(f"Server still running... (checked {connection_count} times)", "DEBUG")
-            threading.Event().wait(1)
-            
-        debug_log("Main loop ended, server is no longer running")
-    except KeyboardInterrupt:
-        debug_log("Received KeyboardInterrupt (Ctrl+C)")
-        print("\nShutting down server...")
-        server.close()
-        debug_log("Server closed due to keyboard interrupt")
+        log.info("Server instance created successfully, starting relay loop")
+        # uvloop is a drop-in replacement for the default loop when it is installed
+        run = uvloop.run if uvloop is not None else asyncio.run
+        run(server.serve())
+        log.info("Relay loop ended, server is no longer running")
     except Exception as e:
-        debug_log(f"Server error: {e}", "ERROR")
-        debug_log("Server error details:", "ERROR")
-        import traceback
-        debug_log(traceback.format_exc(), "ERROR")
+        log.error("Server error: %s", e)
+        log.exception("Server error details:")
         print(f"Server error: {e}")
     finally:
-        debug_log("=== SERVER SHUTDOWN ===")
+        log.info("=== SERVER SHUTDOWN ===")
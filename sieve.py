@@ -20,7 +20,7 @@ def is_ally_general(general, tile):
 
 def is_ally_minion(general, tile):
   if tile.entity is None: return False
-  return tile.entity in general.bg.minions and tile.entity.is_ally(general)
+  return tile.entity.side == general.side and tile.entity in general.bg.minion_set
   
 def is_empty(general, tile):
   return tile.entity is None
@@ -29,11 +29,11 @@ def is_enemy(general, tile):
   return tile.entity and not tile.entity.is_ally(general)
 
 def is_enemy_general(general, tile):
-  return tile.entity == general.bg.generals[(general.side+1)%2]
+  return tile.entity == general.bg.generals[general.side ^ 1]
 
 def is_inrange(general, tile, radius):
-  a = area.Circle(general.bg, radius=radius)
-  return tile in a.get_tiles(general.x, general.y)
+  # Same tiles a Circle around the general would give, without building it
+  return general.bg.is_inside(tile.x, tile.y) and (tile.x-general.x, tile.y-general.y) in area.circle_offset_set(radius)
 
 def is_inrange_close(general, tile):
   return is_inrange(general, tile, 8)
@@ -42,8 +42,8 @@ def is_inrange_long(general, tile):
   return is_inrange(general, tile, 20)
 
 def is_minion(general, tile):
-  return tile.entity and tile.entity in general.bg.minions
+  return tile.entity and tile.entity in general.bg.minion_set
 
 def is_unit(general, tile):
-  return tile.entity and (tile.entity in general.bg.minions or tile.entity in general.bg.generals)
+  return tile.entity and (tile.entity in general.bg.minion_set or tile.entity in general.bg.generals)
 
@@ -6,27 +6,48 @@ import effect
 import sieve
 import status
 
+NEIGHBOUR_OFFSETS = tuple((i, j) for i in [-1, 0, 1] for j in [-1, 0, 1] if (i, j) != (0, 0))
+
+# Pattern shapes mirrored for each side (and direction), in the order the minions are placed
+GLIDER_OFFSETS = {(side, go_bottom): ((-i, -j), (0, -j), (0, 0), (i, 0), (-i, j))
+                  for (side, i) in [(0, 1), (1, -1)] for (go_bottom, j) in [(True, 1), (False, -1)]}
+LWSS_OFFSETS = {side: ((-j, -1), (0, -1), (j, -1), (2*j, -1), (-2*j, 0), (2*j, 0), (2*j, 1), (-2*j, 2), (j, 2))
+                for (side, j) in [(0, 1), (1, -1)]}
+
 class Skill(object):
-  def __init__(self, general, function, max_cd, parameters=[], quote="", description="", area=None, multifunction=False):
+  def __init__(self, general, function, max_cd, parameters=None, quote="", description="", area=None, multifunction=False, short_circuit=False):
     self.general = general
     self.function = function
     self.original_max_cd = max_cd
     self.max_cd = max_cd
     self.cd = 0
-    self.parameters = parameters
+    self.parameters = parameters if parameters is not None else []
     self.area = area
     self.quote = quote
     self.description = description
     self.multifunction = multifunction
+    self.short_circuit = short_circuit # Stop at the first tile that works
 
   def apply_function(self, tiles):
+    general = self.general
+    if self.short_circuit:
+      functions = list(zip(self.function, self.parameters)) if self.multifunction else [(self.function, self.parameters)]
+      for t in tiles:
+        for (function, parameters) in functions:
+          if function(general, t, *parameters):
+            return True
+      return False
+    # Otherwise every function runs on every tile for its side effects
     did_anything = False
-    for t in tiles:
-      if self.multifunction:
-        for i in range(0, len(self.function)):
-          did_anything += self.function[i](self.general, t, *self.parameters[i])
-      else:
-        did_anything += self.function(self.general, t, *self.parameters)
+    if self.multifunction:
+      functions = list(zip(self.function, self.parameters))
+      for t in tiles:
+        for (function, parameters) in functions:
+          did_anything |= function(general, t, *parameters)
+    else:
+      (function, parameters) = (self.function, self.parameters)
+      for t in tiles:
+        did_anything |= function(general, t, *parameters)
     return did_anything
 
   def change_cd(self, delta):
@@ -38,7 +59,7 @@ class Skill(object):
 
   def clone(self, general):
     return self.__class__(general, self.function, self.max_cd, self.parameters, self.quote, self.description,
-                          self.area.clone(general) if self.area else None, self.multifunction)
+                          self.area.clone(general) if self.area else None, self.multifunction, self.short_circuit)
 
   def get_area_tiles(self, x, y):
     if self.area is None: return None
@@ -88,7 +109,7 @@ def apply_status(general, tile, status, selfcast=False):
 def apply_statuses(general, tile, statuses):
   for s in statuses:
     apply_status(general, tile, s)
-  return statuses != []
+  return len(statuses) > 0
 
 def consume(general, tile, hp_gain=1, delta_cd=1):
   tile.entity.die()
@@ -115,7 +136,7 @@ def create_minions(general, l):
   for (x, y) in l:
     minion_placed = general.minion.clone(x, y)
     if minion_placed is not None:
-      general.bg.minions.append(minion_placed)
+      general.bg.add_minion(minion_placed)
       general.minions_alive += 1
       did_anything = True
   return did_anything
@@ -136,7 +157,7 @@ def decapitate(general, tile, threshold=1.0):
       apply_status(general, t, status.Haste(None, 30, "Decapitation haste", 3))
   return True
 
-def explosion(general, tile, power, area, statuses=[]):
+def explosion(general, tile, power, area, statuses=()):
   for s in statuses:
     (s.x, s.y) = (tile.x, tile.y)
   did_anything = False
@@ -153,24 +174,21 @@ def heal(general, tile, amount):
 def minion_glider(general, tile, go_bottom = True):
   (x, y) = (tile.x, tile.y)
   if not general.bg.is_inside(x-1, y-1) or not general.bg.is_inside(x+1, y+1): return False
-  j = 1 if go_bottom else -1
-  i = 1 if general.side == 0 else -1
-  return create_minions(general, [(x-i, y-j), (x, y-j), (x, y), (x+i, y), (x-i, y+j)])
+  return create_minions(general, [(x+dx, y+dy) for (dx, dy) in GLIDER_OFFSETS[(general.side, go_bottom)]])
 
 def minion_lwss(general, tile):
   (x, y) = (tile.x, tile.y)
   if not general.bg.is_inside(x-2, y-2) or not general.bg.is_inside(x+2, y+2): return False
-  j = 1 if general.side == 0 else -1
-  return create_minions(general,\
-    [(x-1*j, y-1), (x, y-1), (x+1*j, y-1), (x+2*j, y-1), (x-2*j, y), (x+2*j, y), (x+2*j, y+1), (x-2*j, y+2), (x+1*j, y+2)])
+  return create_minions(general, [(x+dx, y+dy) for (dx, dy) in LWSS_OFFSETS[general.side]])
 
 def nuke(general, tile, nuke_power, nuke_effect=None, nuke_type="magical"):
   tile.entity.get_attacked(general, nuke_power, nuke_effect, nuke_type)
   return True
 
-def nuke_statuses(general, tile, nuke_power, nuke_effect=None, nuke_type="magical", statuses=[]):
+def nuke_statuses(general, tile, nuke_power, nuke_effect=None, nuke_type="magical", statuses=()):
   nuke(general, tile, nuke_power, nuke_effect, nuke_type)
-  apply_statuses(general, tile, statuses)
+  if statuses:
+    apply_statuses(general, tile, statuses)
   return True
 
 def null(general):
@@ -193,19 +211,15 @@ def recall_entity(general, tile, duration):
   return False
 
 def restock_minions(general, number):
-  #TODO: this can be a lot cleaner
-  tmp = general.minions_alive
-  general.minions_alive = number
-  general.formation.place_minions()
-  general.minions_alive = tmp
-  general.command_tactic([i for i,x in enumerate(general.tactics) if x == general.selected_tactic][0])
+  general.formation.place_minions(number)
+  general.recommand_tactic()
   general.recount_minions_alive()
   return True
 
 def sonic_waves(general, power, waves):
   for i in range(0, waves):
-    x = general.x+1-(i+1)/2 if general.side == 0 else general.x-1+(i+1)/2
-    y = general.y+(((i+1)/2)*(-1 if i%2 == 0 else 1))
+    x = general.x+1-(i+1)//2 if general.side == 0 else general.x-1+(i+1)//2
+    y = general.y+(((i+1)//2)*(-1 if i%2 == 0 else 1))
     if general.bg.is_inside(x,y):
       general.bg.effects.append(Wave(general.bg, general.side, x, y, power))
   return waves > 0
@@ -215,12 +229,15 @@ def teleport(general, tile, entity):
 
 def water_pusher(general, tile):
   did_anything = False
-  for i in [-1, 0, 1]:
-    for j in [-1, 0, 1]:
-      if not general.bg.is_inside(tile.x + i, tile.y + j): continue
-      entity = general.bg.tiles[(tile.x + i, tile.y + j)].entity
-      if entity is not None and (i, j) != (0, 0) and entity.can_be_pushed(i, j):
-        entity.get_pushed(i, j)
-        did_anything = True
+  bg = general.bg
+  (x, y) = (tile.x, tile.y)
+  # Away from the borders the whole neighbourhood is inside, no need to check each tile
+  all_inside = bg.is_inside(x-1, y-1) and bg.is_inside(x+1, y+1)
+  for (i, j) in NEIGHBOUR_OFFSETS:
+    if not all_inside and not bg.is_inside(x+i, y+j): continue
+    entity = bg.tiles_arr[y+j][x+i].entity
+    if entity is not None and entity.can_be_pushed(i, j):
+      entity.get_pushed(i, j)
+      did_anything = True
   return did_anything
 
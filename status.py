@@ -8,26 +8,28 @@ import concepts
 import libtcodpy as libtcod
 
 import random
+import sys
 
 class Status(object):
   def __init__(self, entity=None, owner=None, duration=9999, name="Status"):
     self.entity = entity
     self.owner = owner
     self.duration = duration
-    self.name = name
+    # Names like "Dream Coil stun" are not interned by the compiler, this lets lookups match by identity
+    self.name = sys.intern(name)
     self.attack_effect = None
     self.attack_type = "magical"
     self.kills = 0
     self.duplicated = False
     if entity: # Not a prototype
-      if hasattr(entity, 'statuses'):
-        for s in entity.statuses:
-          if s.name == self.name:
-            # We refresh the duration if it's bigger
-            s.duration = max(s.duration, self.duration)
-            self.duplicated = True
-            return
-        entity.statuses.append(self)
+      s = entity.status_by_name.get(self.name)
+      if s is not None:
+        # We refresh the duration if it's bigger
+        s.duration = max(s.duration, self.duration)
+        self.duplicated = True
+        return
+      entity.statuses.append(self)
+      entity.status_by_name[self.name] = self
   
   def clone(self, entity):
     return self.__class__(entity, self.owner, self.duration, self.name)
@@ -36,6 +38,7 @@ class Status(object):
     self.duration = -1
     if self.entity:
       self.entity.statuses.remove(self)
+      self.entity.status_by_name.pop(self.name, None)
 
   def register_kill(self, killed):
     self.kills += 1
@@ -87,11 +90,17 @@ class Bleeding(Status):
   def tick(self):
     if not self.entity:
       return
-    if (self.last_x, self.last_y) != (self.entity.x, self.entity.y):
-      diff = max(abs(self.last_x - self.entity.x), abs(self.last_y - self.entity.y))
-      self.entity.get_attacked(self.owner, diff*self.power, None, "magical")
-      effect.TempEffect(self.entity.bg, self.entity.side, self.last_x, self.last_y, '*', concepts.FACTION_DOTO_DARK)
-      (self.last_x, self.last_y) = (self.entity.x, self.entity.y)
+    (x, y) = (self.entity.x, self.entity.y)
+    if x == self.last_x and y == self.last_y:
+      return
+    # Tiles moved, counting diagonals as one
+    (dx, dy) = (x - self.last_x, y - self.last_y)
+    dx = -dx if dx < 0 else dx
+    dy = -dy if dy < 0 else dy
+    diff = dy if dy > dx else dx
+    self.entity.get_attacked(self.owner, diff*self.power, None, "magical")
+    effect.TempEffect(self.entity.bg, self.entity.side, self.last_x, self.last_y, '*', concepts.FACTION_DOTO_DARK)
+    (self.last_x, self.last_y) = (self.entity.x, self.entity.y)
 
 class Blind(Status):
   def __init__(self, entity=None, duration=9999, name="Blindness"):
@@ -105,6 +114,24 @@ class Blind(Status):
       self.entity.power = self.saved_power
     super(Blind, self).end()
 
+class DualShield(Status):
+  def __init__(self, entity=None, duration=9999, name="Dual shield", armors=None):
+    super(DualShield, self).__init__(entity, None, duration, name)
+    self.armors = armors if armors is not None else {}
+    if entity and not self.duplicated:
+      for (armor_type, armor) in self.armors.items():
+        entity.armor[armor_type] += armor
+
+  def clone(self, entity):
+    return self.__class__(entity, self.duration, self.name, self.armors)
+
+  def end(self):
+    super(DualShield, self).end()
+    if self.entity:
+      self.entity.update_color()
+      for (armor_type, armor) in self.armors.items():
+        self.entity.armor[armor_type] -= armor
+
 class Empower(Status):
   def __init__(self, entity=None, owner=None, duration=9999, name="Empower", power_ratio=0):
     super(Empower, self).__init__(entity, owner, duration, name)
@@ -124,7 +151,7 @@ class Empower(Status):
 class FreezeCooldowns(Status):
   def __init__(self, entity=None, owner=None, duration=9999, name="Freeze cooldowns"):
     super(FreezeCooldowns, self).__init__(entity, owner, duration, name)
-    if self.entity and getattr(self.entity, 'bg', None) and self.entity not in self.entity.bg.generals:
+    if self.entity and self.entity.bg and self.entity not in self.entity.bg.generals:
       self.end()
 
   def tick(self):
@@ -152,9 +179,10 @@ class Jumping(Status):
     self.status = status
     self.power = power
     self.power_delta = power_delta
-    self.rand = random.Random()
-    self.rand.seed(duration)
-    self.already_hit = []
+    # Only the first bolt of a chain seeds a generator, the jumps share it
+    self.rand = None
+    self.seed = duration
+    self.already_hit = set() # Shared along the chain
     if entity:
       self.attack_effect = effect.TempEffect(entity.bg, char='-', color=owner.color if owner else concepts.ENTITY_DEFAULT)
 
@@ -166,11 +194,13 @@ class Jumping(Status):
     if not self.entity or not self.area or not self.status:
       return
     self.entity.get_attacked(self)
-    self.already_hit.append(self.entity)
+    self.already_hit.add(self.entity)
     self.status.clone(self.entity)
     entities = [tile.entity for tile in self.area.get_tiles(self.entity.x, self.entity.y)
                               if tile.entity not in self.already_hit]
     if entities:
+      if self.rand is None:
+        self.rand = random.Random(self.seed)
       e = self.rand.choice(entities)
       clone = self.clone(e)
       clone.power += self.power_delta
@@ -207,6 +237,7 @@ class Linked(Status):
     self.power = power
     self.radius = radius
     self.status = status
+    self.link_color = libtcod.color_lerp(concepts.UI_BACKGROUND, owner.original_color, 0.4) if owner else None
     if entity:
       self.tiles = area.Circle(entity.bg, radius=radius).get_tiles(x, y)
       Stunned(entity, owner, 1, name + " stun")
@@ -225,17 +256,18 @@ class Linked(Status):
     
   def update(self):
     super(Linked, self).update()
-    if not self.entity or not self.entity.bg or not self.owner or not self.status:
+    entity = self.entity
+    if not entity or not entity.bg or not self.owner or not self.status:
       return
-    t = self.entity.bg.tiles[(self.entity.x, self.entity.y)]
     if self.duration > 0:
-      if t not in self.tiles:
-        self.status.clone(self.entity)
-        self.entity.get_attacked(self)
+      (bg, x, y) = (entity.bg, entity.x, entity.y)
+      # Same test as looking for its tile in self.tiles, without going through the whole circle
+      if not bg.is_inside(x, y) or (x-self.x, y-self.y) not in area.circle_offset_set(self.radius):
+        self.status.clone(entity)
+        entity.get_attacked(self)
         self.end()
       else:
-        t.bg_color = libtcod.color_lerp(concepts.UI_BACKGROUND, self.owner.original_color, 0.4)
-        # Note: Dynamic color interpolation - appropriate use of libtcod.color_lerp for status effects
+        bg.tiles_arr[y][x].bg_color = self.link_color
 
 class Poison(Status):
   # tbt = time between ticks
@@ -278,8 +310,7 @@ class Phasing(Status):
   def __init__(self, entity=None, duration=9999, name="Phasing"):
     super(Phasing, self).__init__(entity, None, duration, name)
     if entity:
-      self.p_shield = Shield(entity, duration+1, "Phasing physical shield", 10000, "physical")
-      self.m_shield = Shield(entity, duration+1, "Phasing magical shield", 10000, "magical")
+      self.shield = DualShield(entity, duration+1, "Phasing shield", {"physical": 10000, "magical": 10000})
       entity.bg.tiles[(entity.x, entity.y)].entity = None
       entity.next_action = duration+1
       self.placeholder = Entity(entity.bg, entity.side, entity.x, entity.y, 'u', entity.color)
@@ -289,11 +320,10 @@ class Phasing(Status):
 
   def end(self):
     super(Phasing, self).end()
-    self.p_shield.end()
-    self.m_shield.end()
+    self.shield.end()
     if self.placeholder:
       self.placeholder.die()
-    if self.entity and self.entity.bg and hasattr(self.entity, 'x') and hasattr(self.entity, 'y'):
+    if self.entity and self.entity.bg:
       self.entity.bg.tiles[(self.entity.x, self.entity.y)].entity = self.entity
 
 class Recalling(Status):
@@ -303,11 +333,11 @@ class Recalling(Status):
 
   def update(self):
     super(Recalling, self).update()
-    if self.duration > 0 and self.entity and self.entity.bg and self.color:
-      self.entity.next_action = 100
-      tile = self.entity.bg.tiles[(self.entity.x, self.entity.y)]
-      self.entity.color = libtcod.color_lerp(tile.bg_color, self.color, 1-(self.duration/10.0))
-      # Note: Dynamic color interpolation for status effects - appropriate use of libtcod
+    entity = self.entity
+    if self.duration > 0 and entity and entity.bg and self.color:
+      entity.next_action = 100
+      tile = entity.bg.tiles[(entity.x, entity.y)]
+      entity.color = libtcod.color_lerp(tile.bg_color, self.color, 1-(self.duration/10.0))
 
   def end(self):
     super(Recalling, self).end()
@@ -358,7 +388,7 @@ class Taunted(Status):
       return
     if self.entity in self.entity.bg.generals:
       self.entity.place_flag(self.owner.x, self.owner.y)
-    elif self.entity in self.entity.bg.minions:
+    elif self.entity in self.entity.bg.minion_set:
       self.entity.tactic = tactic.attack_general
 
 class Vanished(Status):
@@ -377,7 +407,7 @@ class Vanished(Status):
 
   def end(self):
     super(Vanished, self).end()
-    if self.entity and hasattr(self, 'x') and hasattr(self, 'y'):
+    if self.entity: # Then x and y were saved when it vanished
       if self.entity.teleport(self.x, self.y):
         self.entity.reset_action()
       else:
@@ -393,12 +423,12 @@ class Vanishing(Status):
 
   def update(self):
     super(Vanishing, self).update()
-    if self.duration > 0 and self.entity and self.entity.bg:
-      self.entity.next_action = 100
-      tile = self.entity.bg.tiles[(self.entity.x, self.entity.y)]
-      if self.entity.color and tile.bg_color:
-        self.entity.color = libtcod.color_lerp(self.entity.color, tile.bg_color, 1-(self.duration/10.0))
-      # Note: Dynamic color interpolation for status effects - appropriate use of libtcod
+    entity = self.entity
+    if self.duration > 0 and entity and entity.bg:
+      entity.next_action = 100
+      tile = entity.bg.tiles[(entity.x, entity.y)]
+      if entity.color and tile.bg_color:
+        entity.color = libtcod.color_lerp(entity.color, tile.bg_color, 1-(self.duration/10.0))
 
   def end(self):
     super(Vanishing, self).end()
@@ -1,30 +1,32 @@
-from math import copysign
+FORWARD = ((1, 0), (-1, 0)) # Per side
 
 def attack_general(minion):
-  minion.move(copysign(1, minion.bg.generals[(minion.side+1)%2].x - minion.x),
-              copysign(1, minion.bg.generals[(minion.side+1)%2].y - minion.y))
+  move_towards(minion, minion.bg.generals[minion.side ^ 1])
 
 def backward(minion):
-  minion.move(-1 if minion.side == 0 else 1, 0)
+  (dx, dy) = FORWARD[minion.side]
+  minion.move(-dx, dy)
 
 def defend_general(minion):
-  minion.move(copysign(1, minion.bg.generals[minion.side].x - minion.x),
-              copysign(1, minion.bg.generals[minion.side].y - minion.y))
+  move_towards(minion, minion.bg.generals[minion.side])
 
 def disperse(minion):
   r = 5
+  (x, y) = (minion.x, minion.y)
+  bg = minion.bg
+  # The window is clipped to the battleground once instead of testing every cell
+  (left, mid, right) = (max(x-r, 0), max(x, 0), min(x+r+1, bg.width))
   d = {(1,1):0, (-1,1):0, (-1,-1):0, (1,-1):0}
-  for i in range(-r, r+1):
-    for j in range(-r, r+1):
-      (x, y) = (minion.x+i, minion.y+j)
-      if not minion.bg.is_inside(x, y): continue
-      entity = minion.bg.tiles[(x, y)].entity
-      if entity is not None and entity != minion:
-        d[(copysign(1, i), copysign(1, j))] += 1
+  for row_y in range(max(y-r, 0), min(y+r+1, bg.height)):
+    row = bg.tiles_arr[row_y]
+    # As with copysign, the minion's own row and column count as positive
+    j = 1 if row_y >= y else -1
+    d[(-1, j)] += sum(1 for t in row[left:mid] if t.entity is not None)
+    d[(1, j)] += sum(1 for t in row[mid:right] if t.entity is not None and t.entity is not minion)
   minion.move(*min(d, key=d.get))
 
 def forward(minion):
-  minion.move(1 if minion.side == 0 else -1, 0)
+  minion.move(*FORWARD[minion.side])
 
 def go_bottom(minion):
   minion.move(0, 1)
@@ -38,6 +40,10 @@ def go_sides(minion):
 def go_top(minion):
   minion.move(0, -1)
 
+def move_towards(minion, target):
+  # As copysign(1, d) did, being level with the target still moves on that axis
+  minion.move(1 if target.x >= minion.x else -1, 1 if target.y >= minion.y else -1)
+
 def null(minion):
   pass
   
@@ -4,13 +4,17 @@ from battleground import Battleground
 import concepts
 import libtcodpy as libtcod
 
+from collections import deque
+from functools import lru_cache
+import numpy
 import socket
+import struct
 import sys
 import textwrap
 import time
 
 # Import DEBUG from config module to avoid circular imports
-from config import DEBUG
+from config import DEBUG, VSYNC
 
 BG_WIDTH = 60
 BG_HEIGHT = 43
@@ -27,12 +31,29 @@ BG_OFFSET_X = PANEL_WIDTH
 BG_OFFSET_Y = MSG_HEIGHT + 1
 PANEL_OFFSET_X = 0
 PANEL_OFFSET_Y = BG_OFFSET_Y + 3
+PANEL_OFFSETS_X = [0, PANEL_WIDTH + BG_WIDTH]
 MSG_OFFSET_X = BG_OFFSET_X
 MSG_OFFSET_Y = 1
 INFO_OFFSET_X = PANEL_WIDTH + 1
 INFO_OFFSET_Y = BG_OFFSET_Y + BG_HEIGHT
 
 TURN_LAG = 1
+MSG_HEADER = struct.Struct("!IH") # Turn and payload length in front of every network message
+POLL_INTERVAL = 0.005 # Seconds to wait once the event queue is empty
+# Key releases would only repeat the command of the press, so libtcod drops them before they reach us
+POLL_EVENTS = libtcod.EVENT_KEY_PRESS | libtcod.EVENT_MOUSE
+# textwrap.wrap builds a new wrapper on every call
+MSG_WRAPPER = textwrap.TextWrapper(MSG_WIDTH)
+
+@lru_cache(maxsize=512)
+def bar_text(value, max_value):
+  # Bars are redrawn every frame but their values change slowly, so keep the glyph codes ready to copy
+  return numpy.array([ord(c) for c in "%03d / %03d" % (value, max_value)], dtype=numpy.int32)
+
+@lru_cache(maxsize=256)
+def wrap_message(msg):
+  # Skill quotes and death lines come back again and again, each is only wrapped once
+  return tuple(MSG_WRAPPER.wrap(msg))
 
 class Window(object):
   def __init__(self, battleground, side, host = None, port = None, window_id = 0):
@@ -60,13 +81,14 @@ class Window(object):
       sys.stdout.write("DEBUG: Font set, initializing root console\n")
     
     # Initialize window with a reasonable size
-    libtcod.console_init_root(SCREEN_WIDTH, SCREEN_HEIGHT, 'Rogue Force')
+    libtcod.console_init_root(SCREEN_WIDTH, SCREEN_HEIGHT, 'Rogue Force', vsync=VSYNC)
     
     if DEBUG:
       sys.stdout.write("DEBUG: Root console initialized successfully\n")
       sys.stdout.write("DEBUG: Game window should be visible now\n")
 
-    self.messages = [{}, {}]
+    # A turn's commands are only needed until it is processed, TURN_LAG turns later
+    self.messages = [TurnMessages(TURN_LAG + 1), TurnMessages(TURN_LAG + 1)]
 
     if DEBUG:
       sys.stdout.write("DEBUG: Creating console objects\n")
@@ -79,13 +101,17 @@ class Window(object):
     if DEBUG:
       sys.stdout.write("DEBUG: Console objects created\n")
 
-    self.game_msgs = []
+    self.game_msgs = deque(maxlen=MSG_HEIGHT) # Appending to a full log drops its first line
+    self.game_msgs_changed = False # The messages console is only printed again after a new message
     self.game_over = False
     self.area_hover_color = concepts.UI_HOVER_VALID
     self.area_hover_color_invalid = concepts.UI_HOVER_INVALID
     self.default_hover_color = concepts.UI_HOVER_DEFAULT
     self.default_hover_function = SingleTarget(self.bg).get_all_tiles
     self.hover_function = None
+    # The default tiles only depend on the mouse cell, unlike skill areas which follow the general
+    self.hover_pos = None
+    self.hover_default_tiles = []
 
     if DEBUG:
       sys.stdout.write("DEBUG: Window.__init__ completed\n")
@@ -104,28 +130,36 @@ class Window(object):
   def clean_all(self):
     return False
 
+  def decode_message(self, data):
+    return data
+
   def do_hover(self, x, y):
+    if (x, y) != self.hover_pos:
+      self.hover_pos = (x, y)
+      self.hover_default_tiles = self.default_hover_function(x, y)
     if self.hover_function:
       tiles = self.hover_function(x,y)
       if tiles is None:
-        self.bg.hover_tiles(self.default_hover_function(x,y), self.area_hover_color)
+        self.bg.hover_tiles(self.hover_default_tiles, self.area_hover_color)
       elif tiles:
         self.bg.hover_tiles(tiles, self.area_hover_color)
       else:
-        self.bg.hover_tiles(self.default_hover_function(x, y), self.area_hover_color_invalid)
+        self.bg.hover_tiles(self.hover_default_tiles, self.area_hover_color_invalid)
     else:
-      self.bg.hover_tiles(self.default_hover_function(x, y), self.default_hover_color)
+      self.bg.hover_tiles(self.hover_default_tiles, self.default_hover_color)
+
+  def encode_message(self, msg):
+    return msg
 
   def message(self, new_msg, color=concepts.UI_TEXT):
     #split the message if necessary, among multiple lines
-    new_msg_lines = textwrap.wrap(new_msg, MSG_WIDTH)
-    for line in new_msg_lines:
-      #if the buffer is full, remove the first line to make room for the new one
+    for line in wrap_message(new_msg):
+      #if the buffer is full, the first line goes and every other one moves up
       if len(self.game_msgs) == MSG_HEIGHT:
-        del self.game_msgs[0]
         libtcod.console_clear(self.con_msgs)
       #add the new line as a tuple, with the text and the color
       self.game_msgs.append((line, color))
+    self.game_msgs_changed = True
 
   def loop(self):
     if DEBUG:
@@ -135,25 +169,19 @@ class Window(object):
     turn_time = 0.1
     key = libtcod.Key()
     mouse = libtcod.Mouse()
+    # The input loop below polls many times per turn, so the names it calls are bound locally
+    check_for_event = libtcod.sys_check_for_event
+    monotonic = time.monotonic
     while not self.game_over:
-      start = time.time()
-      if turn > 0:
-        if self.network:
-          received = self.network.recv()
-        else:
-          ai = self.ai_action(turn)
-          if ai:
-            received = str(turn) + "#" + ai
-          else:
-            received = "D"
-        # Ensure received is a string before splitting
-        received_str = str(received) if received else ""
-        split = received_str.split("#")
-        if len(split) == 2:
-          self.messages[not self.side][int(split[0])] = str(split[1])
-
-      while time.time() - start < turn_time:
-        libtcod.sys_check_for_event(libtcod.EVENT_ANY, key, mouse)
+      # A monotonic deadline, wall-clock adjustments must not stretch or skip a turn
+      deadline = monotonic() + turn_time
+      if turn > 0 and not self.network:
+        ai = self.ai_action(turn)
+        if ai:
+          self.receive_message(turn, self.encode_message(ai))
+
+      while monotonic() < deadline:
+        event = check_for_event(POLL_EVENTS, key, mouse)
         (x, y) = (mouse.cx-BG_OFFSET_X, mouse.cy-BG_OFFSET_Y)
         if key.vk == libtcod.KEY_ESCAPE:
           if DEBUG:
@@ -167,12 +195,20 @@ class Window(object):
         s = self.check_input(key, mouse, x, y)
         if s is not None:
           self.messages[self.side][turn] = s
+        if not event:
+          # Pending events are drained back to back, only an empty queue waits instead of spinning
+          time.sleep(max(0, min(POLL_INTERVAL, deadline - monotonic())))
 
       if self.network:
         if turn in self.messages[self.side]:
-          self.network.send(str(turn) + "#"  + self.messages[self.side][turn])
+          self.network.send(turn, self.encode_message(self.messages[self.side][turn]))
         else:
-          self.network.send("D")
+          self.network.send(turn, "") # Nothing to do, but the other side still waits for this turn
+        # The other side's previous turn is only waited for now, so it arrives while we take input
+        if turn > 0:
+          received = self.network.recv()
+          if received is not None:
+            self.receive_message(*received)
       self.process_messages(turn - TURN_LAG)
       self.update_all()
       winner = self.check_winner()
@@ -192,14 +228,18 @@ class Window(object):
   def process_messages(self, turn):
     return False
 
+  def receive_message(self, turn, data):
+    if data:
+      msg = self.decode_message(data)
+      if msg is not None:
+        self.messages[not self.side][turn] = msg
+
   def render_all(self, x, y):
     if DEBUG:
       sys.stdout.write("DEBUG: render_all called\n")
     
-    # Clear the main console first
-    libtcod.console_clear(self.con_root)
-    
-    # Draw the battleground
+    # The main console is not cleared: every frame blits the same regions over it and the gaps stay blank
+    # The terrain covers the whole battleground console, so it needs no clearing
     self.bg.draw(self.con_bg)
     if DEBUG:
       sys.stdout.write("DEBUG: Battleground drawn\n")
@@ -216,17 +256,13 @@ class Window(object):
     if DEBUG:
       sys.stdout.write("DEBUG: Panels rendered\n")
     
-    # Clear background console before blitting
-    libtcod.console_clear(self.con_bg)
-    self.bg.draw(self.con_bg)
-    
     # Fix blit calls with correct parameter types for Pylance
     if DEBUG:
       sys.stdout.write("DEBUG: Starting blit operations\n")
       
     self.con_bg.blit(self.con_root, BG_OFFSET_X, BG_OFFSET_Y, 0, 0, BG_WIDTH, BG_HEIGHT)
     for i in [0,1]:
-      self.con_panels[i].blit(self.con_root, (PANEL_WIDTH+BG_WIDTH)*i, PANEL_OFFSET_Y, 0, 0, PANEL_WIDTH, PANEL_HEIGHT)
+      self.con_panels[i].blit(self.con_root, PANEL_OFFSETS_X[i], PANEL_OFFSET_Y, 0, 0, PANEL_WIDTH, PANEL_HEIGHT)
     self.con_info.blit(self.con_root, INFO_OFFSET_X, INFO_OFFSET_Y, 0, 0, MSG_WIDTH, MSG_HEIGHT)
     self.con_msgs.blit(self.con_root, MSG_OFFSET_X, MSG_OFFSET_Y, 0, 0, MSG_WIDTH, MSG_HEIGHT)
     libtcod.console_blit(self.con_root, 0, 0, SCREEN_WIDTH, SCREEN_HEIGHT, 0, 0, 0)  # type: ignore[arg-type]
@@ -237,12 +273,12 @@ class Window(object):
 
   def render_bar(self, con, x, y, w, value, max_value, bar_bg_color, bar_fg_color, text_color):
     ratio = int(w*(float(value)/max_value))
-    libtcod.console_set_default_background(con, bar_fg_color)
-    libtcod.console_rect(con, x, y, ratio, 1, False, libtcod.BKGND_SET)
-    libtcod.console_set_default_background(con, bar_bg_color)
-    libtcod.console_rect(con, x+ratio, y, w-ratio, 1, False, libtcod.BKGND_SET)
-    libtcod.console_set_default_background(con, text_color)
-    con.print_box(x+1, y, w, 1, "%03d / %03d" % (value, max_value), text_color)
+    # Colors go straight into each draw call instead of through the console's default background
+    con.draw_rect(x, y, ratio, 1, ch=0, bg=bar_fg_color)
+    con.draw_rect(x+ratio, y, w-ratio, 1, ch=0, bg=bar_bg_color)
+    text = bar_text(value, max_value)[:w]
+    con.ch[y, x+1:x+1+len(text)] = text
+    con.fg[y, x+1:x+1+len(text)] = text_color
  
   def render_info(self, x, y):
     self.con_info.print(0, 0, " " * INFO_WIDTH)
@@ -257,6 +293,9 @@ class Window(object):
           self.con_info.print(0, 0, entity.name.capitalize())
     
   def render_msgs(self):
+    if not self.game_msgs_changed:
+      return
+    self.game_msgs_changed = False
     y = 0
     for (line, color) in self.game_msgs:
       self.con_msgs.print(0, y, line, color)
@@ -271,28 +310,68 @@ class Window(object):
   def render_side_panel(self, i, bar_length, bar_offset_x):
     pass
 
+  def render_side_panel_static(self, i, bar_length=11, bar_offset_x=4):
+    pass
+
   def render_side_panel_clear(self, i, bar_length=11, bar_offset_x=4):
-    libtcod.console_set_default_background(self.con_panels[i], concepts.UI_BACKGROUND)
-    libtcod.console_rect(self.con_panels[i], bar_offset_x-1, 0, bar_length+1, 40, True, libtcod.BKGND_SET)
+    self.con_panels[i].draw_rect(bar_offset_x-1, 0, bar_length+1, 40, ch=ord(' '), bg=concepts.UI_BACKGROUND)
 
   def update_all(self):
     for g in self.bg.generals:
       g.update()
+    # The dead stay listed until clean_all and their update would return straight away
     for e in self.bg.effects:
-      e.update()
+      if e.alive: e.update()
     for m in self.bg.minions:
-      m.update()
+      if m.alive: m.update()
 
 class Network(object):
   def __init__(self, host, port):
     self.s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    self.s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
     self.s.connect((host, port))
+    self.buf = bytearray() # Received bytes not returned yet
 
   def recv(self):
-    data = self.s.recv(1024)
-    return data.decode('utf-8') if isinstance(data, bytes) else data
-
-  def send(self, data):
-    if isinstance(data, str):
-      data = data.encode('utf-8')
-    self.s.send(data)
+    # TCP can merge or split messages, so the header tells where each one ends
+    while True:
+      if len(self.buf) >= MSG_HEADER.size:
+        (turn, length) = MSG_HEADER.unpack_from(self.buf)
+        end = MSG_HEADER.size + length
+        if len(self.buf) >= end:
+          data = self.buf[MSG_HEADER.size:end].decode('utf-8')
+          del self.buf[:end]
+          return (turn, data)
+      chunk = self.s.recv(4096)
+      if not chunk:
+        return None
+      self.buf += chunk
+
+  def send(self, turn, data):
+    data = data.encode('utf-8')
+    # A turn message must leave whole, a short send would split it across two of the peer's turns
+    self.s.sendall(MSG_HEADER.pack(turn, len(data)) + data)
+
+class TurnMessages(object):
+  # Commands by turn in a fixed ring, an old turn is overwritten instead of kept for the whole game
+  def __init__(self, size):
+    self.turns = [None] * size
+    self.msgs = [None] * size
+
+  def __contains__(self, turn):
+    return self.turns[turn % len(self.turns)] == turn
+
+  def __getitem__(self, turn):
+    i = turn % len(self.turns)
+    if self.turns[i] != turn:
+      raise KeyError(turn)
+    return self.msgs[i]
+
+  def __setitem__(self, turn, msg):
+    i = turn % len(self.turns)
+    self.turns[i] = turn
+    self.msgs[i] = msg
+
+  def get(self, turn, default=None):
+    i = turn % len(self.turns)
+    return self.msgs[i] if self.turns[i] == turn else default